@@ -1,12 +1,15 @@
 import argparse
-import json
+import asyncio
+import re
 import sys
 from base64 import b64decode
 from dataclasses import asdict, dataclass, field
-from time import sleep
+from functools import cached_property
+from importlib.util import find_spec
 from typing import Self, cast
 
-from httpx import Client, Response
+import orjson
+from httpx import AsyncClient, AsyncHTTPTransport, Limits, Response, Timeout
 
 REFUND_CHAR = "!"
 
@@ -20,14 +23,27 @@ class Config:
     presets: dict[str, str] = field(default_factory=dict)
     timeout: float = 1.0
 
+    def __post_init__(self) -> None:
+        self._dirty = False
+
+    @cached_property
+    def user_id(self) -> str:
+        return b64decode(self.token.partition(".")[0] + "==").decode()
+
+    def mark_dirty(self) -> None:
+        self._dirty = True
+
     @classmethod
     def from_file(cls, filename: str = FILENAME) -> Self:
-        with open(filename, encoding="u8") as f:
-            return cls(**json.load(f))
+        with open(filename, "rb") as f:
+            return cls(**orjson.loads(f.read()))
 
     def to_file(self, filename: str = FILENAME) -> None:
-        with open(filename, "w", encoding="u8") as f:
-            json.dump(asdict(self), f, indent=4)
+        if not self._dirty:
+            return
+        with open(filename, "wb") as f:
+            f.write(orjson.dumps(asdict(self), option=orjson.OPT_INDENT_2))
+        self._dirty = False
 
 
 COMMANDS = {
@@ -41,26 +57,45 @@ COMMANDS = {
 }
 
 
-def validate_input(string: str) -> bool:
-    return string.find(REFUND_CHAR) <= 0 and all(c.isdigit() or c in COMMANDS for c in string)
+SEQUENCE_PATTERN = re.compile(
+    rf"{re.escape(REFUND_CHAR)}?[0-9{re.escape(''.join(c for c in COMMANDS if c != REFUND_CHAR))}]*"
+)
+
 
+def validate_input(string: str) -> bool:
+    return SEQUENCE_PATTERN.fullmatch(string) is not None
 
-def process_badges(session: Client, seq: str, timeout: float, user_id: str | int) -> None:
-    def send(content: str) -> Response:
-        return session.post("/messages", json={"content": content})
 
+def compile_sequence(seq: str, user_id: str | int) -> list[tuple[str, str]]:
+    program = list[tuple[str, str]]()
     i = 0
     while i < len(seq):
-        command = COMMANDS[seq[i]]
+        char, command = seq[i], COMMANDS[seq[i]]
         if i < len(seq) - 1 and (amount := seq[i + 1]).isdigit():
             command += f" {amount}"
             i += 1
-        print("Refunding badges" if seq[i] == REFUND_CHAR else f"Getting {command}")
-        send(f"${command}".format(user_id=user_id))
-        sleep(timeout)
-        send("confirm" if seq[i] == REFUND_CHAR else "y")
-        sleep(timeout)
+        print("Refunding badges" if char == REFUND_CHAR else f"Getting {command}")
+        reply = "confirm" if char == REFUND_CHAR else "y"
+        program.append((f"${command}".format(user_id=user_id), reply))
         i += 1
+    return program
+
+
+async def process_badges(
+    session: AsyncClient, seq: str, timeout: float, user_id: str | int
+) -> None:
+    async def send(content: str) -> Response:
+        # overlap the request round-trip with the delay between messages
+        response, _ = await asyncio.gather(
+            session.post("/messages", content=orjson.dumps({"content": content})),
+            asyncio.sleep(timeout),
+        )
+        return response
+
+    async with session:
+        for content, reply in compile_sequence(seq, user_id):
+            await send(content)
+            await send(reply)
 
 
 class Args(argparse.Namespace):
@@ -118,8 +153,8 @@ def list_presets(config: Config) -> None:
         print("No saved presets.")
     else:
         print("Saved presets:")
-        offset = len(max(config.presets, key=len))
-        print("\n".join(f"{preset:<{offset}} - {seq}" for preset, seq in config.presets.items()))
+        offset = max(map(len, config.presets))
+        print("\n".join([f"{preset:<{offset}} - {seq}" for preset, seq in config.presets.items()]))
 
 
 def delete_presets(config: Config, presets: list[str]) -> bool:
@@ -127,6 +162,7 @@ def delete_presets(config: Config, presets: list[str]) -> bool:
     for preset in presets:
         if preset in config.presets:
             del config.presets[preset]
+            config.mark_dirty()
         else:
             not_found.append(preset)
 
@@ -148,6 +184,7 @@ def save_preset(config: Config, preset: str, seq: str) -> None:
         if input(prompt).strip().lower() not in ("y", ""):
             return
     config.presets[preset] = seq
+    config.mark_dirty()
     config.to_file()
     print(f"Sequence {seq!r} saved as {preset!r}.")
 
@@ -181,16 +218,28 @@ def main() -> bool:
         print("Empty sequence!")
         return False
 
-    with Client(
+    timeout = args.timeout or config.timeout
+    transport = AsyncHTTPTransport(
+        http2=find_spec("h2") is not None,
+        limits=Limits(
+            max_connections=2,
+            max_keepalive_connections=1,
+            keepalive_expiry=max(30.0, timeout * len(sequence) * 4),
+        ),
+        retries=1,
+    )
+    session = AsyncClient(
+        transport=transport,
+        timeout=Timeout(10.0, connect=5.0),
         base_url=f"https://discord.com/api/v9/channels/{args.channel or config.channel_id}",
         headers={
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; WOW64) AppleWebKit/537.36 (KHTML, "
             "like Gecko) discord/1.0.9017 Chrome/108.0.5359.215 Electron/22.3.12 Safari/537.36",
             "Authorization": config.token,
+            "Content-Type": "application/json",
         },
-    ) as session:
-        user_id = b64decode(config.token.partition(".")[0]).decode()
-        process_badges(session, sequence, args.timeout or config.timeout, user_id)
+    )
+    asyncio.run(process_badges(session, sequence, timeout, config.user_id))
     return True
 
 